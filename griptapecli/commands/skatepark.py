@@ -1,11 +1,24 @@
 import functools
 import os
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 import click
 import requests
 import uvicorn
+import watchfiles
 
-from griptapecli.core.models import Structure, StructureRun
+from griptapecli.core.cache import fingerprint_files
+from griptapecli.core.models import Log, Structure, StructureRun
+from griptapecli.core.recording import load_capture, percentile
+
+DISCOVER_IGNORED_DIRS = {"__pycache__", "node_modules"}
+REPLAY_ROUTE_PREFIX = "/api/structure-runs/{structure_run_id}"
+REPLAY_IGNORED_ROUTES = {"/api/structure-runs/{structure_run_id}/profile"}
 
 
 def server_options(func):
@@ -63,11 +76,21 @@ def skatepark(ctx):
 
 @skatepark.command(name="start")
 @server_options
+@click.option(
+    "--record",
+    type=click.Path(dir_okay=False),
+    help="File to record every API request to, for use with `gt skatepark replay`",
+    required=False,
+)
 def start(
     host: str,
     port: int,
+    record: Optional[str],
 ) -> None:
     """Starts the Griptape server."""
+    if record is not None:
+        os.environ["GT_SKATEPARK_RECORD_FILE"] = os.path.abspath(record)
+
     uvicorn.run(
         "griptapecli.core.skatepark:app",
         host=host,
@@ -81,14 +104,33 @@ def start(
 @server_options
 @structure_options
 @click.option("--tldr", is_flag=True)
+@click.option(
+    "--watch",
+    is_flag=True,
+    help="Watch the Structure for changes and rebuild when its dependencies change",
+)
+@click.option(
+    "--discover",
+    type=click.Path(exists=True, file_okay=False),
+    help="Register every Structure found under this directory",
+    required=False,
+)
 def register(
     host: str,
     port: int,
     directory: str,
     structure_config_file: str,
     tldr: bool,
+    watch: bool,
+    discover: Optional[str],
 ) -> None:
     """Registers a Structure with Skatepark."""
+    if discover is not None:
+        _register_discovered_structures(
+            host, port, discover, structure_config_file, tldr, watch
+        )
+        return
+
     url = f"http://{host}:{port}/api/structures"
     directory = os.path.abspath(directory)
     if tldr is False:
@@ -114,6 +156,70 @@ def register(
     else:
         click.echo(f"Structure registered with id: {structure_id}")
 
+    if watch:
+        _watch_structures(host, port, [structure_id])
+
+
+def _register_discovered_structures(
+    host: str,
+    port: int,
+    root: str,
+    structure_config_file: str,
+    tldr: bool,
+    watch: bool,
+) -> None:
+    structure_inputs = [
+        {"directory": directory, "structure_config_file": structure_config_file}
+        for directory in _discover_structures(root, structure_config_file)
+    ]
+    if tldr is False:
+        click.echo(f"Registering {len(structure_inputs)} Structure(s) from {root}")
+
+    url = f"http://{host}:{port}/api/structures:batch"
+    response = requests.post(url, json={"structures": structure_inputs})
+
+    try:
+        response.raise_for_status()
+    except requests.exceptions.HTTPError as e:
+        click.echo(f"HTTP Error: {e.response.json().get('detail')}")
+        return
+
+    result = response.json()
+    for error in result["errors"]:
+        click.echo(
+            f"Failed to register Structure from {error['directory']}/{error['structure_config_file']}: {error['detail']}",
+            err=True,
+        )
+
+    structure_ids = [structure["structure_id"] for structure in result["structures"]]
+    for structure in result["structures"]:
+        if tldr:
+            click.echo(structure["structure_id"])
+        else:
+            click.echo(
+                f"Structure registered and queued for build with id: {structure['structure_id']} ({structure['directory']})"
+            )
+
+    if structure_ids and tldr is False:
+        click.echo(
+            "Structures that fail to build are removed, see the Skatepark server's logs for details"
+        )
+
+    if watch and structure_ids:
+        _watch_structures(host, port, structure_ids)
+
+
+def _discover_structures(root: str, structure_config_file: str) -> list[str]:
+    directories = []
+    for directory, dirs, files in os.walk(os.path.abspath(root)):
+        dirs[:] = sorted(
+            d for d in dirs if not d.startswith(".") and d not in DISCOVER_IGNORED_DIRS
+        )
+        if structure_config_file in files:
+            directories.append(directory)
+
+    return directories
+
 
 @skatepark.command(name="build")
 @server_options
@@ -178,7 +284,25 @@ def build(
     prompt=False,
     default=lambda: {},
 )
-def run(host: str, port: int, structure_id: str, arg: list[str], env: dict) -> None:
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Profile the Structure Run with cProfile and download the stats",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    help="Bypass the Skatepark run result cache",
+)
+def run(
+    host: str,
+    port: int,
+    structure_id: str,
+    arg: list[str],
+    env: dict,
+    profile: bool,
+    no_cache: bool,
+) -> None:
     """Runs the Structure."""
     click.echo(f"Running Structure: {structure_id}")
     url = f"http://{host}:{port}/api/structures/{structure_id}/runs"
@@ -188,6 +312,8 @@ def run(host: str, port: int, structure_id: str, arg: list[str], env: dict) -> N
         json={
             "args": list(arg),
             "env": env,
+            "profile": profile,
+            "no_cache": no_cache,
         },
     )
     try:
@@ -201,10 +327,19 @@ def run(host: str, port: int, structure_id: str, arg: list[str], env: dict) -> N
         ]:
             run = _get_structure_run(host, port, run.structure_run_id)
 
-        if run.status == StructureRun.Status.SUCCEEDED:
+        if run.status == StructureRun.Status.SUCCEEDED and run.cached:
+            click.echo(
+                f"Structure run succeeded (cached): {run_id}, output: {run.output}"
+            )
+        elif run.status == StructureRun.Status.SUCCEEDED:
             click.echo(f"Structure run succeeded: {run_id}, output: {run.output}")
         elif run.status == StructureRun.Status.FAILED:
-            click.echo(f"Structure run failed: {run_id}, logs: {run.logs}")
+            logs = _get_structure_run_logs(host, port, run_id)
+            click.echo(f"Structure run failed: {run_id}, logs: {logs}")
+
+        if profile:
+            profile_file = _download_structure_run_profile(host, port, run_id)
+            click.echo(f"Structure run profile saved to: {profile_file}")
     except requests.exceptions.HTTPError as e:
         click.echo(f"HTTP Error: {e}")
         return
@@ -223,6 +358,108 @@ def _get_structure_run(
     return StructureRun(**structure_run)
 
 
+def _get_structure_run_logs(
+    host: str,
+    port: int,
+    structure_run_id: str,
+) -> list[Log]:
+    url = f"http://{host}:{port}/api/structure-runs/{structure_run_id}/logs"
+    response = requests.get(url, headers={"Accept": "application/x-ndjson"})
+    response.raise_for_status()
+
+    return [Log.model_validate_json(line) for line in response.content.splitlines()]
+
+
+def _download_structure_run_profile(
+    host: str,
+    port: int,
+    structure_run_id: str,
+) -> str:
+    url = f"http://{host}:{port}/api/structure-runs/{structure_run_id}/profile"
+    response = requests.get(url)
+    response.raise_for_status()
+
+    profile_file = os.path.abspath(f"{structure_run_id}.pstats")
+    with open(profile_file, "wb") as f:
+        f.write(response.content)
+
+    return profile_file
+
+
+def _watch_structures(
+    host: str,
+    port: int,
+    structure_ids: list[str],
+) -> None:
+    structures = [
+        _get_structure(host, port, structure_id) for structure_id in structure_ids
+    ]
+    dependency_fingerprints = [
+        fingerprint_files(structure.get_dependency_files()) for structure in structures
+    ]
+    click.echo(f"Watching {len(structures)} Structure(s) for changes")
+
+    for changes in watchfiles.watch(
+        *[structure.directory for structure in structures],
+        watch_filter=watchfiles.DefaultFilter(
+            ignore_dirs=(*watchfiles.DefaultFilter.ignore_dirs, ".skatepark")
+        ),
+        raise_interrupt=False,
+    ):
+        changed_files = {os.path.abspath(path) for _, path in changes}
+        for i, structure in enumerate(structures):
+            structure_changes = {
+                path
+                for path in changed_files
+                if path.startswith(os.path.join(structure.directory, ""))
+            }
+            if not structure_changes:
+                continue
+
+            # Reload the config first, since it decides which files are dependencies.
+            config_file = os.path.abspath(
+                os.path.join(structure.directory, structure.structure_config_file)
+            )
+            invalidated = False
+            if config_file in structure_changes:
+                click.echo(f"Config changed, invalidating: {structure.structure_id}")
+                structure = _post_structure_action(host, port, structure, "invalidate")
+                if structure is None:
+                    continue
+                structures[i] = structure
+                invalidated = True
+
+            dependency_fingerprint = fingerprint_files(structure.get_dependency_files())
+            if dependency_fingerprint != dependency_fingerprints[i]:
+                click.echo(
+                    f"Dependencies changed, rebuilding: {structure.structure_id}"
+                )
+                structure = _post_structure_action(host, port, structure, "build")
+                if structure is None:
+                    continue
+                structures[i] = structure
+                dependency_fingerprints[i] = dependency_fingerprint
+            elif not invalidated:
+                click.echo(f"Source changed, invalidating: {structure.structure_id}")
+                structure = _post_structure_action(host, port, structure, "invalidate")
+                if structure is not None:
+                    structures[i] = structure
+
+
+def _post_structure_action(
+    host: str, port: int, structure: Structure, action: str
+) -> Optional[Structure]:
+    url = f"http://{host}:{port}/api/structures/{structure.structure_id}/{action}"
+    response = requests.post(url, json={})
+    try:
+        response.raise_for_status()
+    except requests.exceptions.HTTPError as e:
+        click.echo(f"HTTP Error: {e.response.json().get('detail')}")
+        return None
+
+    return Structure(**response.json())
+
+
 def _get_structure(
     host: str,
     port: int,
@@ -292,3 +529,130 @@ def remove_structure(
         return
 
     click.echo(f"Structure removed: {structure_id}")
+
+
+@skatepark.command(name="replay")
+@server_options
+@click.argument("capture_file", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--speed",
+    type=click.FloatRange(min=0),
+    help="Replay speed multiplier. 0 replays requests as fast as possible",
+    default=1.0,
+    required=False,
+)
+@click.option(
+    "--concurrency",
+    "-c",
+    type=click.IntRange(min=1),
+    help="Maximum number of requests in flight",
+    default=10,
+    required=False,
+)
+def replay(
+    host: str,
+    port: int,
+    capture_file: str,
+    speed: float,
+    concurrency: int,
+) -> None:
+    """Replays Structure Run traffic recorded with `gt skatepark start --record`."""
+    base_url = f"http://{host}:{port}"
+    entries = [
+        entry
+        for entry in load_capture(capture_file)
+        if entry["route"].startswith(REPLAY_ROUTE_PREFIX)
+        and entry["route"] not in REPLAY_IGNORED_ROUTES
+    ]
+
+    # Each recorded run is replaced by a run without a Structure or process so that
+    # the capture can be replayed without the original Structures.
+    run_ids = {}
+    for entry in entries:
+        run_id = entry["path"].split("/")[3]
+        if run_id not in run_ids:
+            run_ids[run_id] = uuid.uuid4().hex
+            response = requests.put(
+                f"{base_url}/api/structure-runs/{run_ids[run_id]}",
+                json={"status": "RUNNING"},
+            )
+            try:
+                response.raise_for_status()
+            except requests.exceptions.HTTPError as e:
+                click.echo(f"HTTP Error: {e}")
+                return
+
+    click.echo(
+        f"Replaying {len(entries)} requests for {len(run_ids)} Structure Run(s) from {capture_file}"
+    )
+
+    sessions = threading.local()
+
+    def replay_request(
+        entry: dict, scheduled_at: Optional[float]
+    ) -> tuple[str, float, bool]:
+        if not hasattr(sessions, "session"):
+            sessions.session = requests.Session()
+
+        run_id = entry["path"].split("/")[3]
+        path = entry["path"].replace(run_id, run_ids[run_id], 1)
+        url = (
+            f"{base_url}{path}?{entry['query']}" if entry["query"] else base_url + path
+        )
+        body = entry["body"]
+
+        # Time from when the request should have been sent, not when a worker got to
+        # it, so that a backed up server shows up in the latencies.
+        if scheduled_at is None:
+            scheduled_at = time.perf_counter()
+        try:
+            response = sessions.session.request(
+                entry["method"],
+                url,
+                json=body if not isinstance(body, str) else None,
+                data=body if isinstance(body, str) else None,
+            )
+            error = response.status_code >= 400
+        except requests.exceptions.RequestException:
+            error = True
+
+        return (
+            f"{entry['method']} {entry['route']}",
+            time.perf_counter() - scheduled_at,
+            error,
+        )
+
+    first_entry_at = entries[0]["t"] if entries else 0
+    started_at = time.perf_counter()
+    futures = []
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for entry in entries:
+            scheduled_at = None
+            if speed > 0:
+                scheduled_at = started_at + (entry["t"] - first_entry_at) / speed
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(executor.submit(replay_request, entry, scheduled_at))
+    elapsed = time.perf_counter() - started_at
+
+    latencies = defaultdict(list)
+    errors = Counter()
+    for future in futures:
+        key, latency, error = future.result()
+        latencies[key].append(latency)
+        errors[key] += error
+
+    click.echo(
+        f"Replayed {len(entries)} requests in {elapsed:.2f}s ({len(entries) / elapsed if elapsed else 0:.1f} req/s)"
+    )
+    click.echo(
+        f"{'ROUTE':<60} {'COUNT':>7} {'ERRORS':>7} {'P50':>9} {'P90':>9} {'P99':>9} {'MAX':>9}"
+    )
+    for key in sorted(latencies):
+        values = [latency * 1000 for latency in latencies[key]]
+        click.echo(
+            f"{key:<60} {len(values):>7} {errors[key]:>7} "
+            f"{percentile(values, 50):>7.1f}ms {percentile(values, 90):>7.1f}ms "
+            f"{percentile(values, 99):>7.1f}ms {max(values):>7.1f}ms"
+        )
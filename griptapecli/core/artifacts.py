@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from array import array
+from threading import Lock
+from typing import IO, Optional
+
+from attrs import Factory, define, field
+
+from .models import Event, Log
+
+LOGS_FILE = "logs.ndjson"
+EVENTS_FILE = "events.ndjson"
+OUTPUT_FILE = "output.json"
+
+
+@define
+class NdjsonFile:
+    """Append-only file of JSON lines, indexed by the byte offset of each line.
+
+    The index lets ranges of lines be read with a single seek, and the file is kept
+    open between appends so that writing a line is a single unbuffered write. Appends
+    and reads may come from different threads.
+    """
+
+    path: str = field()
+    size: int = field(default=0)
+    _offsets: array = field(default=Factory(lambda: array("Q")))
+    _stream: Optional[IO[bytes]] = field(default=None)
+    _lock: Lock = field(default=Factory(Lock))
+
+    @property
+    def count(self) -> int:
+        return len(self._offsets)
+
+    def append(self, line: bytes) -> None:
+        with self._lock:
+            if self._stream is None:
+                self._stream = open(self.path, "ab", buffering=0)
+
+            self._stream.write(line + b"\n")
+            self._offsets.append(self.size)
+            self.size += len(line) + 1
+
+    def read(self, offset: int = 0, limit: Optional[int] = None) -> list[bytes]:
+        with self._lock:
+            if offset >= self.count:
+                return []
+
+            start = self._offsets[offset]
+            if limit is None or offset + limit >= self.count:
+                end = self.size
+            else:
+                end = self._offsets[offset + limit]
+
+        with open(self.path, "rb") as f:
+            f.seek(start)
+
+            return f.read(end - start).splitlines()
+
+    def tail(self, count: int) -> list[bytes]:
+        if count <= 0:
+            return []
+
+        return self.read(offset=max(self.count - count, 0))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._stream is not None:
+                self._stream.close()
+                self._stream = None
+
+    def copy_from(self, other: NdjsonFile) -> None:
+        self.close()
+        with other._lock:
+            size = other.size
+            offsets = array("Q", other._offsets)
+        if size:
+            shutil.copyfile(other.path, self.path)
+
+        with self._lock:
+            self.size = size
+            self._offsets = offsets
+
+
+@define
+class RunArtifactStore:
+    """On-disk storage for a Structure Run's logs, events, and output.
+
+    Only sizes and line offsets are kept in memory, so a run's footprint doesn't grow
+    with how much it prints or how large its output is.
+    """
+
+    directory: str = field()
+    output_size: int = field(default=0)
+    _logs: NdjsonFile = field(init=False)
+    _events: NdjsonFile = field(init=False)
+
+    def __attrs_post_init__(self):
+        self._logs = NdjsonFile(os.path.join(self.directory, LOGS_FILE))
+        self._events = NdjsonFile(os.path.join(self.directory, EVENTS_FILE))
+
+    @property
+    def output_file(self) -> str:
+        return os.path.join(self.directory, OUTPUT_FILE)
+
+    @property
+    def log_count(self) -> int:
+        return self._logs.count
+
+    @property
+    def logs_size(self) -> int:
+        return self._logs.size
+
+    @property
+    def event_count(self) -> int:
+        return self._events.count
+
+    @property
+    def events_size(self) -> int:
+        return self._events.size
+
+    def append_log(self, log: Log) -> None:
+        self._logs.append(log.model_dump_json().encode())
+
+    def read_logs(self, offset: int = 0, limit: Optional[int] = None) -> list[Log]:
+        return [
+            Log.model_validate_json(line) for line in self.read_log_lines(offset, limit)
+        ]
+
+    def read_log_lines(
+        self, offset: int = 0, limit: Optional[int] = None
+    ) -> list[bytes]:
+        """Returns logs as their stored JSON lines, without parsing them."""
+        return self._logs.read(offset, limit)
+
+    def tail_logs(self, count: int) -> list[Log]:
+        return [Log.model_validate_json(line) for line in self.tail_log_lines(count)]
+
+    def tail_log_lines(self, count: int) -> list[bytes]:
+        return self._logs.tail(count)
+
+    def append_event(self, event: Event) -> None:
+        self._events.append(event.model_dump_json().encode())
+
+    def read_events(self) -> list[Event]:
+        return [Event.model_validate_json(line) for line in self.read_event_lines()]
+
+    def read_event_lines(self) -> list[bytes]:
+        return self._events.read()
+
+    def write_output(self, output: Optional[dict]) -> None:
+        # Write to a temporary file first so that readers never see a partial output.
+        data = json.dumps(output).encode()
+        with open(f"{self.output_file}.tmp", "wb") as f:
+            f.write(data)
+        os.replace(f"{self.output_file}.tmp", self.output_file)
+
+        self.output_size = len(data)
+
+    def read_output_json(self) -> str:
+        """Returns the output as stored, without parsing it."""
+        if self.output_size == 0:
+            return "null"
+
+        with open(self.output_file, "r") as f:
+            return f.read()
+
+    def read_output(self) -> Optional[dict]:
+        return json.loads(self.read_output_json())
+
+    def close(self) -> None:
+        self._logs.close()
+        self._events.close()
+
+    def copy_from(self, other: RunArtifactStore) -> None:
+        self._logs.copy_from(other._logs)
+        self._events.copy_from(other._events)
+        if other.output_size:
+            shutil.copyfile(other.output_file, self.output_file)
+
+        self.output_size = other.output_size
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import stat
+from collections import OrderedDict
+from typing import Any, Optional
+
+from attrs import define, field
+
+from .artifacts import RunArtifactStore
+from .models import Structure
+
+FINGERPRINT_IGNORED_DIRS = {
+    ".git",
+    ".venv",
+    ".skatepark",
+    "__pycache__",
+    ".mypy_cache",
+    ".pytest_cache",
+}
+
+DEFAULT_RUN_CACHE_MAX_ENTRIES = 256
+DEFAULT_RUN_CACHE_MAX_SIZE = 64 * 1024 * 1024
+
+
+@define
+class RunCacheEntry:
+    """A cached run result, backed by a copy of the run's artifacts owned by the cache.
+
+    The copy is deleted by whoever evicts the entry, so the cache's size limit bounds
+    the disk space it uses.
+    """
+
+    artifacts: RunArtifactStore = field()
+    size: int = field()
+
+    @classmethod
+    def from_artifacts(cls, artifacts: RunArtifactStore) -> RunCacheEntry:
+        size = artifacts.logs_size + artifacts.events_size + artifacts.output_size
+
+        return cls(artifacts=artifacts, size=size)
+
+    def delete(self) -> None:
+        shutil.rmtree(self.artifacts.directory, ignore_errors=True)
+
+
+@define
+class RunCache:
+    max_entries: int = field(default=DEFAULT_RUN_CACHE_MAX_ENTRIES)
+    max_size: int = field(default=DEFAULT_RUN_CACHE_MAX_SIZE)
+    entries: OrderedDict[str, RunCacheEntry] = field(factory=OrderedDict)
+    size: int = field(default=0)
+
+    def get(self, key: str) -> Optional[RunCacheEntry]:
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+
+        return entry
+
+    def put(self, key: str, entry: RunCacheEntry) -> list[RunCacheEntry]:
+        """Adds the entry and returns the entries that no longer fit, to be deleted."""
+        if entry.size > self.max_size:
+            return [entry]
+
+        evicted = []
+        replaced = self.remove(key)
+        if replaced is not None:
+            evicted.append(replaced)
+        self.entries[key] = entry
+        self.size += entry.size
+
+        while len(self.entries) > self.max_entries or self.size > self.max_size:
+            _, oldest = self.entries.popitem(last=False)
+            self.size -= oldest.size
+            evicted.append(oldest)
+
+        return evicted
+
+    def clear(self) -> list[RunCacheEntry]:
+        entries = list(self.entries.values())
+        self.entries.clear()
+        self.size = 0
+
+        return entries
+
+    def remove(self, key: str) -> Optional[RunCacheEntry]:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry.size
+
+        return entry
+
+
+def fingerprint_structure(structure: Structure) -> str:
+    """Hashes the Structure's source tree, config, and env.
+
+    Only regular files are read, so broken symlinks, FIFOs, and sockets are skipped.
+    """
+    digest = hashlib.sha256()
+    _update_field(
+        digest, structure.structure_config.to_json_str_representation().encode()
+    )
+    _update_field(digest, json.dumps(structure.env, sort_keys=True).encode())
+
+    for root, dirs, files in os.walk(structure.directory):
+        dirs[:] = sorted(d for d in dirs if d not in FINGERPRINT_IGNORED_DIRS)
+        for file in sorted(files):
+            path = os.path.join(root, file)
+            file_digest = _hash_file(path)
+            if file_digest is not None:
+                _update_field(
+                    digest, os.path.relpath(path, structure.directory).encode()
+                )
+                _update_field(digest, file_digest)
+
+    return digest.hexdigest()
+
+
+def fingerprint_files(paths: list[str]) -> str:
+    """Hashes the contents of the given files, treating missing files as empty."""
+    digest = hashlib.sha256()
+
+    for path in paths:
+        _update_field(digest, path.encode())
+        _update_field(digest, _hash_file(path) or b"")
+
+    return digest.hexdigest()
+
+
+def build_run_cache_key(
+    structure: Structure, dependencies: str, args: list[str], env: dict
+) -> str:
+    digest = hashlib.sha256()
+    _update_field(digest, fingerprint_structure(structure).encode())
+    _update_field(digest, dependencies.encode())
+    _update_field(digest, json.dumps(args).encode())
+    _update_field(digest, json.dumps(env, sort_keys=True).encode())
+
+    return digest.hexdigest()
+
+
+def _update_field(digest: Any, data: bytes) -> None:
+    # Length-prefix each field so that bytes can't move between adjacent fields
+    # without changing the hash.
+    digest.update(len(data).to_bytes(8, "big"))
+    digest.update(data)
+
+
+def _hash_file(path: str) -> Optional[bytes]:
+    """Returns the digest of a regular file's contents, or None for anything else."""
+    try:
+        if not stat.S_ISREG(os.stat(path).st_mode):
+            return None
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+
+    return digest.digest()
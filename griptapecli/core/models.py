@@ -1,11 +1,19 @@
 from __future__ import annotations
 
+import os
 import uuid
 from enum import Enum
 from typing import Optional
 
 import yaml
-from pydantic import BaseModel, ConfigDict, Field, computed_field, field_validator
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    PrivateAttr,
+    computed_field,
+    field_validator,
+)
 
 STRUCTURE_CONFIG_RUNTIME__PYTHON_3 = "python3"
 STRUCTURE_CONFIG_RUNTIME_VERSION__PYTHON_3_11 = "3.11"
@@ -90,6 +98,8 @@ class StructureConfig(BaseModel):
 class StructureRunInput(BaseModel):
     args: list[str] = Field(default_factory=lambda: [])
     env: dict = Field(default_factory=lambda: {})
+    profile: bool = Field(default=False)
+    no_cache: bool = Field(default=False)
 
 
 class StructureRun(BaseModel):
@@ -105,9 +115,15 @@ class StructureRun(BaseModel):
     status: Status = Field(default=Status.QUEUED)
     args: list[str] = Field(default_factory=lambda: [])
     env: dict = Field(default_factory=lambda: {})
-    events: list[Event] = Field(default_factory=lambda: [])
-    logs: list[Log] = Field(default_factory=lambda: [])
+    event_count: int = Field(default=0)
+    events_size: int = Field(default=0)
+    log_count: int = Field(default=0)
+    logs_size: int = Field(default=0)
     output: Optional[dict] = Field(default=None)
+    output_size: int = Field(default=0)
+    profile: bool = Field(default=False)
+    no_cache: bool = Field(default=False)
+    cached: bool = Field(default=False)
 
 
 class StructureInput(BaseModel):
@@ -116,11 +132,17 @@ class StructureInput(BaseModel):
     env: dict = Field(default_factory=lambda: {})
 
 
+class BatchStructureInput(BaseModel):
+    structures: list[StructureInput] = Field(default_factory=lambda: [])
+
+
 class Structure(BaseModel):
     directory: str = Field()
     structure_config_file: str = Field()
     env: dict = Field(default_factory=lambda: {})
 
+    _structure_config: Optional[StructureConfig] = PrivateAttr(default=None)
+
     def model_post_init(self, __context):
         self._validate_structure()
 
@@ -134,9 +156,27 @@ class Structure(BaseModel):
     @computed_field
     @property
     def structure_config(self) -> StructureConfig:
-        config_path = f"{self.directory}/{self.structure_config_file}"
-        with open(config_path, "r") as config_file:
-            return StructureConfig(**yaml.safe_load(config_file))
+        if self._structure_config is None:
+            config_path = f"{self.directory}/{self.structure_config_file}"
+            with open(config_path, "r") as config_file:
+                self._structure_config = StructureConfig(**yaml.safe_load(config_file))
+
+        return self._structure_config
+
+    def invalidate_structure_config(self) -> None:
+        self._structure_config = None
+        self._validate_structure()
+
+    def get_dependency_files(self) -> list[str]:
+        build = self.structure_config.build
+
+        return [
+            os.path.join(self.directory, file)
+            for file in [
+                build.requirements_file or "requirements.txt",
+                *build.cache_build_dependencies.watched_files,
+            ]
+        ]
 
     def _validate_structure(self):
         try:
@@ -159,3 +199,14 @@ class ListStructureRunEventsResponseModel(BaseModel):
 
 class ListStructureRunLogsResponseModel(BaseModel):
     logs: list[Log] = Field(default_factory=lambda: [])
+
+
+class BatchStructureError(BaseModel):
+    directory: str = Field()
+    structure_config_file: str = Field()
+    detail: str = Field()
+
+
+class BatchStructuresResponseModel(BaseModel):
+    structures: list[Structure] = Field(default_factory=lambda: [])
+    errors: list[BatchStructureError] = Field(default_factory=lambda: [])
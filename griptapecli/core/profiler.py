@@ -0,0 +1,31 @@
+"""Runs a Structure's main file under cProfile.
+
+This file is executed directly by the Structure's own interpreter, so it must only
+depend on the standard library. Unlike `python -m cProfile`, it preserves the exit
+code of the profiled program.
+
+Usage: python profiler.py <profile_file> <main_file> [args...]
+"""
+
+import cProfile
+import os
+import runpy
+import sys
+
+
+def main() -> None:
+    profile_file, main_file, *args = sys.argv[1:]
+    sys.argv = [main_file, *args]
+    sys.path[0] = os.path.dirname(os.path.abspath(main_file))
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        runpy.run_path(main_file, run_name="__main__")
+    finally:
+        profiler.disable()
+        profiler.dump_stats(profile_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+import json
+import math
+import time
+from typing import IO, Any, Optional
+
+from attrs import define, field
+
+
+@define
+class TrafficRecorder:
+    """Appends one compact JSON line per API request to a capture file."""
+
+    file: str = field()
+    started_at: float = field(factory=time.perf_counter)
+    _stream: IO[str] = field(init=False)
+
+    def __attrs_post_init__(self):
+        self._stream = open(self.file, "a", buffering=1)
+
+    def record(
+        self,
+        method: str,
+        route: str,
+        path: str,
+        query: str,
+        body: bytes,
+        status_code: int,
+        started_at: float,
+        duration: float,
+    ) -> None:
+        entry = {
+            "t": round(started_at - self.started_at, 6),
+            "method": method,
+            "route": route,
+            "path": path,
+            "query": query,
+            "body": _decode_body(body),
+            "status": status_code,
+            "duration": round(duration, 6),
+        }
+        self._stream.write(json.dumps(entry, separators=(",", ":")) + "\n")
+
+
+def load_capture(file: str) -> list[dict]:
+    with open(file, "r") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+
+    return sorted(entries, key=lambda entry: entry["t"])
+
+
+def percentile(values: list[float], percent: float) -> float:
+    if not values:
+        return 0.0
+
+    values = sorted(values)
+    index = max(math.ceil(percent / 100 * len(values)) - 1, 0)
+
+    return values[index]
+
+
+def _decode_body(body: bytes) -> Optional[Any]:
+    if not body:
+        return None
+
+    try:
+        return json.loads(body)
+    except ValueError:
+        return body.decode(errors="replace")
@@ -1,17 +1,33 @@
 from __future__ import annotations
 
+import asyncio
+import codecs
 import datetime
+import json
 import logging
 import os
+import shutil
+import stat
 import subprocess
-import threading
+import tempfile
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from typing import Optional
 
 from dotenv import dotenv_values
-from fastapi import FastAPI, HTTPException, Request, status
+from fastapi import FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
 
+from .artifacts import RunArtifactStore
+from .cache import RunCacheEntry, build_run_cache_key, fingerprint_files
 from .models import (
+    BatchStructureError,
+    BatchStructureInput,
+    BatchStructuresResponseModel,
     Event,
     ListStructureRunEventsResponseModel,
     ListStructureRunLogsResponseModel,
@@ -23,9 +39,21 @@ from .models import (
     StructureRun,
     StructureRunInput,
 )
+from .recording import TrafficRecorder
 from .state import RunProcess, State
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Run state only lives in memory, so nothing can reach the artifacts once the
+    # server stops.
+    await asyncio.to_thread(_remove_all_run_data)
+
+
+app = FastAPI(lifespan=lifespan)
+# The default compression level of 9 costs a lot of CPU for little gain on JSON.
+app.add_middleware(GZipMiddleware, minimum_size=1000, compresslevel=5)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -33,6 +61,48 @@ logger = logging.getLogger(__name__)
 state = State()
 
 DEFAULT_QUEUE_DELAY = "2"
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "skatepark")
+DEFAULT_RUN_CACHE = "false"
+DEFAULT_RUN_TIMEOUT = "0"
+DEFAULT_BUILD_CONCURRENCY = "4"
+LOG_LINE_LIMIT = 64 * 1024
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+PROFILER_FILE = os.path.join(os.path.dirname(__file__), "profiler.py")
+
+build_executor = ThreadPoolExecutor(
+    max_workers=int(
+        os.getenv("GT_SKATEPARK_BUILD_CONCURRENCY", DEFAULT_BUILD_CONCURRENCY)
+    ),
+    thread_name_prefix="skatepark-build",
+)
+
+recorder: Optional[TrafficRecorder] = None
+if os.getenv("GT_SKATEPARK_RECORD_FILE"):
+    recorder = TrafficRecorder(file=os.environ["GT_SKATEPARK_RECORD_FILE"])
+
+    @app.middleware("http")
+    async def record_traffic(request: Request, call_next):
+        started_at = time.perf_counter()
+        body = await request.body()
+        # Requests whose handler raises are recorded as the 500 they turn into.
+        status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+        finally:
+            route = request.scope.get("route")
+            recorder.record(
+                method=request.method,
+                route=route.path if route is not None else request.url.path,
+                path=request.url.path,
+                query=request.url.query,
+                body=body,
+                status_code=status_code,
+                started_at=started_at,
+                duration=time.perf_counter() - started_at,
+            )
+
+        return response
 
 
 @app.post("/api/structures", status_code=status.HTTP_201_CREATED)
@@ -55,6 +125,37 @@ def create_structure(structureInput: StructureInput) -> Structure:
     return structure
 
 
+@app.post(
+    "/api/structures:batch",
+    response_model=BatchStructuresResponseModel,
+    status_code=status.HTTP_201_CREATED,
+)
+def create_structures_batch(batch_input: BatchStructureInput):
+    logger.info(f"Creating {len(batch_input.structures)} structures")
+
+    with ThreadPoolExecutor() as executor:
+        results = list(
+            executor.map(_create_validated_structure, batch_input.structures)
+        )
+
+    response = BatchStructuresResponseModel()
+    for structure_input, result in zip(batch_input.structures, results):
+        if isinstance(result, Structure):
+            state.register_structure(result)
+            build_executor.submit(_build_structure_in_background, result.structure_id)
+            response.structures.append(result)
+        else:
+            response.errors.append(
+                BatchStructureError(
+                    directory=structure_input.directory,
+                    structure_config_file=structure_input.structure_config_file,
+                    detail=result,
+                )
+            )
+
+    return response
+
+
 @app.get(
     "/api/structures",
     response_model=ListStructuresResponseModel,
@@ -63,7 +164,9 @@ def create_structure(structureInput: StructureInput) -> Structure:
 def list_structures():
     logger.info("Listing structures")
 
-    return {"structures": list(state.structures.values())}
+    return _encode_response(
+        ListStructuresResponseModel(structures=list(state.structures.values())),
+    )
 
 
 @app.get(
@@ -88,6 +191,13 @@ def delete_structure(structure_id: str):
     logger.info(f"Deleting structure: {structure_id}")
 
     state.remove_structure(structure_id)
+    for structure_run_id, run in list(state.runs.items()):
+        if (
+            run.run.structure is not None
+            and run.run.structure.structure_id == structure_id
+            and (run.process is None or run.process.returncode is not None)
+        ):
+            _remove_run(structure_run_id)
 
 
 @app.post("/api/structures/{structure_id}/build", status_code=status.HTTP_201_CREATED)
@@ -95,70 +205,193 @@ def build_structure(structure_id: str) -> Structure:
     logger.info(f"Building structure: {structure_id}")
     structure = state.get_structure(structure_id)
 
+    try:
+        structure.invalidate_structure_config()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     _validate_files(structure)
     structure.env = dotenv_values(f"{structure.directory}/.env")
 
-    subprocess.call(
-        ["python3", "-m", "venv", ".venv"],
-        cwd=structure.directory,
-    )
-    subprocess.run(
-        [
-            ".venv/bin/pip3",
-            "install",
-            "--upgrade",
-            "--force-reinstall",
-            "-r",
-            (
-                str(
-                    os.path.join(
-                        "./", structure.structure_config.build.requirements_file
+    build_fingerprint = fingerprint_files(structure.get_dependency_files())
+    if (
+        structure.structure_config.build.cache_build_dependencies.enabled
+        and state.build_fingerprints.get(structure_id) == build_fingerprint
+        and os.path.isdir(state.venvs.get(structure_id, ""))
+    ):
+        logger.info(f"Dependencies unchanged, skipping install: {structure_id}")
+
+        return structure
+
+    venv = os.path.join(_get_venvs_dir(structure), uuid.uuid4().hex)
+    with state.venvs_lock:
+        state.building_venvs.add(venv)
+    try:
+        subprocess.run(
+            ["python3", "-m", "venv", venv],
+            cwd=structure.directory,
+            check=True,
+        )
+        subprocess.run(
+            [
+                os.path.join(venv, "bin", "pip3"),
+                "install",
+                "--upgrade",
+                "-r",
+                (
+                    str(
+                        os.path.join(
+                            "./", structure.structure_config.build.requirements_file
+                        )
                     )
-                )
-                if structure.structure_config.build.requirements_file
-                else "requirements.txt"
-            ),
-        ],
-        cwd=structure.directory,
-    )
+                    if structure.structure_config.build.requirements_file
+                    else "requirements.txt"
+                ),
+            ],
+            cwd=structure.directory,
+            check=True,
+        )
+    except subprocess.CalledProcessError as e:
+        with state.venvs_lock:
+            state.building_venvs.discard(venv)
+        shutil.rmtree(venv, ignore_errors=True)
+
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to build Structure: {e}",
+        )
+
+    if _run_cache_enabled():
+        state.dependencies[structure_id] = subprocess.run(
+            [os.path.join(venv, "bin", "pip3"), "freeze"],
+            cwd=structure.directory,
+            capture_output=True,
+            text=True,
+        ).stdout
+
+    with state.venvs_lock:
+        state.venvs[structure_id] = venv
+        state.building_venvs.discard(venv)
+        state.build_fingerprints[structure_id] = build_fingerprint
+    logger.info(f"Switched structure {structure_id} to venv: {venv}")
+
+    _remove_unused_venvs(structure)
+
+    return structure
+
+
+@app.post("/api/structures/{structure_id}/invalidate", status_code=status.HTTP_200_OK)
+def invalidate_structure(structure_id: str) -> Structure:
+    logger.info(f"Invalidating structure: {structure_id}")
+    structure = state.get_structure(structure_id)
+
+    try:
+        structure.invalidate_structure_config()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    structure.env = dotenv_values(f"{structure.directory}/.env")
 
     return structure
 
 
 @app.post("/api/structures/{structure_id}/runs", status_code=status.HTTP_201_CREATED)
-def create_structure_run(
+async def create_structure_run(
     structure_id: str, run_input: StructureRunInput, request: Request
 ) -> StructureRun:
     logger.info(f"Creating run for structure: {structure_id}")
     structure = state.get_structure(structure_id)
     structure_run = StructureRun(structure=structure, **run_input.model_dump())
     _validate_files(structure)
+    artifacts = RunArtifactStore(directory=_get_run_dir(structure_run.structure_run_id))
+
+    cache_key = None
+    if _run_cache_enabled() and not structure_run.profile:
+        cache_key = await asyncio.to_thread(
+            build_run_cache_key,
+            structure,
+            state.dependencies.get(structure_id, ""),
+            structure_run.args,
+            structure_run.env,
+        )
+        cache_entry = None if structure_run.no_cache else state.run_cache.get(cache_key)
+        if cache_entry is not None:
+            try:
+                await asyncio.to_thread(artifacts.copy_from, cache_entry.artifacts)
+            except FileNotFoundError:
+                evicted = state.run_cache.remove(cache_key)
+                if evicted is not None:
+                    await asyncio.to_thread(evicted.delete)
+            else:
+                logger.info(
+                    f"Using cached result for run: {structure_run.structure_run_id}"
+                )
+                structure_run.status = StructureRun.Status.SUCCEEDED
+                structure_run.cached = True
+                structure_run.event_count = artifacts.event_count
+                structure_run.events_size = artifacts.events_size
+                structure_run.log_count = artifacts.log_count
+                structure_run.logs_size = artifacts.logs_size
+                structure_run.output_size = artifacts.output_size
+                run_process = RunProcess(
+                    run=structure_run, process=None, artifacts=artifacts
+                )
+                state.runs[structure_run.structure_run_id] = run_process
 
-    process = subprocess.Popen(
-        [
-            ".venv/bin/python3",
+                return Response(
+                    await asyncio.to_thread(_dump_run_json, run_process),
+                    status_code=status.HTTP_201_CREATED,
+                    media_type="application/json",
+                )
+
+    profile_file = None
+    if structure_run.profile:
+        profile_file = os.path.join(artifacts.directory, "profile.pstats")
+
+    # Register the run before spawning it so that its venv counts as in use and
+    # can't be removed by a concurrent build in the meantime.
+    with state.venvs_lock:
+        venv = state.venvs.get(structure_id)
+        if venv is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Structure not built"
+            )
+
+        run_process = RunProcess(
+            run=structure_run,
+            process=None,
+            artifacts=artifacts,
+            venv=venv,
+            profile_file=profile_file,
+            cache_key=cache_key,
+        )
+        state.runs[structure_run.structure_run_id] = run_process
+
+    python = os.path.join(venv, "bin", "python3")
+    if profile_file is not None:
+        command = [python, PROFILER_FILE, profile_file]
+    else:
+        command = [python]
+
+    try:
+        run_process.process = await asyncio.create_subprocess_exec(
+            *command,
             structure.structure_config.run.main_file,
             *structure_run.args,
-        ],
-        cwd=structure.directory,
-        stderr=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        env={
-            "GT_CLOUD_STRUCTURE_RUN_ID": structure_run.structure_run_id,
-            "GT_CLOUD_BASE_URL": str(request.base_url),
-            **os.environ,
-            **structure.env,
-            **structure_run.env,
-        },
-    )
-    state.runs[structure_run.structure_run_id] = RunProcess(
-        run=structure_run, process=process
-    )
-
-    threading.Thread(
-        target=_set_structure_run_to_running,
-        args=(state.runs[structure_run.structure_run_id].run,),
-    ).start()
+            cwd=structure.directory,
+            stderr=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            limit=LOG_LINE_LIMIT,
+            env={
+                "GT_CLOUD_STRUCTURE_RUN_ID": structure_run.structure_run_id,
+                "GT_CLOUD_BASE_URL": str(request.base_url),
+                **os.environ,
+                **structure.env,
+                **structure_run.env,
+            },
+        )
+    except Exception:
+        state.runs.pop(structure_run.structure_run_id, None)
+        raise
+    run_process.task = asyncio.create_task(_supervise_run(run_process))
 
     return structure_run
 
@@ -171,17 +404,41 @@ def create_structure_run(
 def list_structure_runs(structure_id: str):
     logger.info(f"Listing runs for structure: {structure_id}")
 
-    return {
-        "structure_runs": [
-            run.run
-            for run in state.runs.values()
-            if run.run.structure.structure_id == structure_id
-        ]
-    }
+    # Outputs are left out of the list, fetch a run to get its output.
+    return _encode_response(
+        ListStructureRunsResponseModel(
+            structure_runs=[
+                run.run
+                for run in list(state.runs.values())
+                if run.run.structure is not None
+                and run.run.structure.structure_id == structure_id
+            ]
+        ),
+    )
+
+
+@app.put("/api/structure-runs/{structure_run_id}", status_code=status.HTTP_201_CREATED)
+async def put_run(structure_run_id: str, values: dict) -> StructureRun:
+    # Runs created this way have no Structure or process. `gt skatepark replay` uses them
+    # to stand in for the runs in a capture.
+    logger.info(f"Putting run: {structure_run_id}")
+    if structure_run_id in state.runs:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Run already exists"
+        )
+
+    run = StructureRun(**(values | {"structure_run_id": structure_run_id}))
+    state.runs[structure_run_id] = RunProcess(
+        run=run,
+        process=None,
+        artifacts=RunArtifactStore(directory=_get_run_dir(structure_run_id)),
+    )
+
+    return run
 
 
 @app.patch("/api/structure-runs/{structure_run_id}", status_code=status.HTTP_200_OK)
-def patch_run(structure_run_id: str, values: dict) -> StructureRun:
+async def patch_run(structure_run_id: str, values: dict) -> StructureRun:
     logger.info(f"Patching run: {structure_run_id}")
     cur_run = state.runs[structure_run_id].run.model_dump()
     new_run = StructureRun(**(cur_run | values))
@@ -190,15 +447,17 @@ def patch_run(structure_run_id: str, values: dict) -> StructureRun:
     return new_run
 
 
-@app.get("/api/structure-runs/{structure_run_id}", status_code=status.HTTP_200_OK)
-def get_run(structure_run_id: str) -> StructureRun:
+@app.get(
+    "/api/structure-runs/{structure_run_id}",
+    response_model=StructureRun,
+    status_code=status.HTTP_200_OK,
+)
+def get_run(structure_run_id: str):
     logger.info(f"Getting run: {structure_run_id}")
 
-    run = state.runs[structure_run_id]
-
-    _check_run_process(run)
-
-    return state.runs[structure_run_id].run
+    return Response(
+        _dump_run_json(state.runs[structure_run_id]), media_type="application/json"
+    )
 
 
 @app.post(
@@ -218,11 +477,16 @@ def create_run_event(
         event = Event(value=event_value)
         events.append(event)
         current_run = state.runs[structure_run_id]
-        current_run.run.events.append(event)
+        current_run.artifacts.append_event(event)
+        current_run.run.event_count = current_run.artifacts.event_count
+        current_run.run.events_size = current_run.artifacts.events_size
 
         if event.value.get("type") == "FinishStructureRunEvent":
-            current_run.run.output = event.value.get("output_task_output")
-            _check_run_process(current_run)
+            current_run.artifacts.write_output(event.value.get("output_task_output"))
+            current_run.run.output_size = current_run.artifacts.output_size
+            # Runs without a process, such as those seeded by replay, have no
+            # supervisor to close their files.
+            current_run.artifacts.close()
 
     return events
 
@@ -232,16 +496,23 @@ def create_run_event(
     status_code=status.HTTP_200_OK,
     response_model=ListStructureRunEventsResponseModel,
 )
-def list_run_events(structure_run_id: str):
+def list_run_events(structure_run_id: str, request: Request):
     logger.info(f"Getting events for run: {structure_run_id}")
 
-    events = state.runs[structure_run_id].run.events
+    artifacts = state.runs[structure_run_id].artifacts
+    if _accepts_ndjson(request):
+        lines = artifacts.read_event_lines()
+        sorted_lines = sorted(
+            lines, key=lambda line: json.loads(line)["value"]["timestamp"]
+        )
+
+        return _encode_ndjson_response(sorted_lines)
+
+    events = artifacts.read_events()
 
     sorted_events = sorted(events, key=lambda event: event.value["timestamp"])
 
-    return {
-        "events": sorted_events,
-    }
+    return _encode_response(ListStructureRunEventsResponseModel(events=sorted_events))
 
 
 @app.get(
@@ -249,80 +520,367 @@ def list_run_events(structure_run_id: str):
     status_code=status.HTTP_200_OK,
     response_model=ListStructureRunLogsResponseModel,
 )
-def list_run_logs(structure_run_id: str):
+def list_run_logs(
+    structure_run_id: str,
+    request: Request,
+    offset: int = Query(default=0, ge=0),
+    limit: Optional[int] = Query(default=None, ge=0),
+    tail: Optional[int] = Query(default=None, ge=0),
+):
     logger.info(f"Getting logs for run: {structure_run_id}")
 
-    logs = state.runs[structure_run_id].run.logs
+    artifacts = state.runs[structure_run_id].artifacts
+    if _accepts_ndjson(request):
+        if tail is not None:
+            lines = artifacts.tail_log_lines(tail)
+        else:
+            lines = artifacts.read_log_lines(offset=offset, limit=limit)
+
+        return _encode_ndjson_response(lines)
+
+    if tail is not None:
+        logs = artifacts.tail_logs(tail)
+    else:
+        logs = artifacts.read_logs(offset=offset, limit=limit)
+
+    return _encode_response(ListStructureRunLogsResponseModel(logs=logs))
+
+
+@app.get(
+    "/api/structure-runs/{structure_run_id}/profile",
+    status_code=status.HTTP_200_OK,
+    response_class=FileResponse,
+)
+async def get_run_profile(structure_run_id: str):
+    logger.info(f"Getting profile for run: {structure_run_id}")
+
+    run = state.runs[structure_run_id]
+
+    if run.profile_file is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Run was not profiled"
+        )
+
+    if (
+        run.process is None
+        or run.process.returncode is None
+        or not os.path.isfile(run.profile_file)
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Profile not available yet"
+        )
+
+    return FileResponse(
+        run.profile_file,
+        media_type="application/octet-stream",
+        filename=f"{structure_run_id}.pstats",
+    )
+
+
+def _encode_response(content: BaseModel) -> Response:
+    # Serialize with pydantic-core directly instead of letting FastAPI re-validate
+    # the content against the response model.
+    return Response(content.model_dump_json(), media_type="application/json")
+
+
+def _accepts_ndjson(request: Request) -> bool:
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _encode_ndjson_response(lines: list[bytes]) -> Response:
+    # The lines are returned as stored, skipping parsing and serialization entirely.
+    return Response(
+        b"".join(line + b"\n" for line in lines), media_type=NDJSON_MEDIA_TYPE
+    )
+
+
+def _get_run_dir(structure_run_id: str) -> str:
+    data_dir = os.getenv("GT_SKATEPARK_DATA_DIR", DEFAULT_DATA_DIR)
+    run_dir = os.path.join(data_dir, "runs", structure_run_id)
+    os.makedirs(run_dir, exist_ok=True)
+
+    return run_dir
+
+
+def _remove_run(structure_run_id: str) -> None:
+    run = state.runs.pop(structure_run_id, None)
+    if run is not None:
+        run.artifacts.close()
+        shutil.rmtree(run.artifacts.directory, ignore_errors=True)
 
-    return {
-        "logs": logs,
+
+def _remove_all_run_data() -> None:
+    for structure_run_id in list(state.runs.keys()):
+        _remove_run(structure_run_id)
+    _delete_cache_entries(state.run_cache.clear())
+
+
+def _get_cache_entry_dir() -> str:
+    data_dir = os.getenv("GT_SKATEPARK_DATA_DIR", DEFAULT_DATA_DIR)
+    cache_entry_dir = os.path.join(data_dir, "cache", uuid.uuid4().hex)
+    os.makedirs(cache_entry_dir, exist_ok=True)
+
+    return cache_entry_dir
+
+
+def _get_venvs_dir(structure: Structure) -> str:
+    return os.path.join(structure.directory, ".skatepark", "venvs")
+
+
+def _get_venvs_in_use(structure_id: str) -> set[str]:
+    venvs = {
+        run.venv
+        for run in list(state.runs.values())
+        if run.venv is not None
+        and (run.process is None or run.process.returncode is None)
     }
+    venvs.update(state.building_venvs)
+    if structure_id in state.venvs:
+        venvs.add(state.venvs[structure_id])
+
+    return venvs
+
+
+def _remove_unused_venvs(structure: Structure) -> None:
+    venvs_dir = _get_venvs_dir(structure)
+    if not os.path.isdir(venvs_dir):
+        return
+
+    for version in os.listdir(venvs_dir):
+        venv = os.path.join(venvs_dir, version)
+        # Check against the live state rather than a snapshot so that builds started
+        # during the cleanup keep their venvs. Venvs are never reused, so one that
+        # isn't in use now can't become in use later.
+        with state.venvs_lock:
+            if venv in _get_venvs_in_use(structure.structure_id):
+                continue
+
+        logger.info(f"Removing unused venv: {venv}")
+        shutil.rmtree(venv, ignore_errors=True)
+
+
+def _create_validated_structure(structure_input: StructureInput) -> Structure | str:
+    try:
+        structure = Structure(**structure_input.model_dump())
+        _validate_files(structure)
+    except HTTPException as e:
+        return e.detail
+    except Exception as e:
+        return str(e)
+
+    return structure
+
+
+def _build_structure_in_background(structure_id: str) -> None:
+    try:
+        build_structure(structure_id)
+    except Exception:
+        logger.exception(f"Failed to build structure: {structure_id}")
+        # The structure may have been deleted while it was building.
+        state.discard_structure(structure_id)
+
+
+def _stat(path: str) -> Optional[os.stat_result]:
+    try:
+        return os.stat(path)
+    except OSError:
+        return None
 
 
 def _validate_files(structure: Structure) -> None:
-    if not os.path.exists(structure.directory):
+    directory_stat = _stat(structure.directory)
+    if directory_stat is None:
         raise HTTPException(status_code=400, detail="Directory does not exist")
 
-    if not os.path.isdir(structure.directory):
+    if not stat.S_ISDIR(directory_stat.st_mode):
         raise HTTPException(status_code=400, detail="Path is not a directory")
 
-    if not os.path.exists(f"{structure.directory}/{structure.structure_config_file}"):
+    config_file_stat = _stat(f"{structure.directory}/{structure.structure_config_file}")
+    if config_file_stat is None:
         raise HTTPException(
             status_code=400, detail="Structure Config file does not exist"
         )
 
-    if not os.path.isfile(f"{structure.directory}/{structure.structure_config_file}"):
+    if not stat.S_ISREG(config_file_stat.st_mode):
         raise HTTPException(
             status_code=400, detail="Structure Config file is not a file"
         )
 
     main_file = structure.structure_config.run.main_file
+    main_file_stat = _stat(f"{structure.directory}/{main_file}")
 
-    if not os.path.exists(f"{structure.directory}/{main_file}"):
+    if main_file_stat is None:
         raise HTTPException(status_code=400, detail="Main file does not exist")
 
-    if not os.path.isfile(f"{structure.directory}/{main_file}"):
+    if not stat.S_ISREG(main_file_stat.st_mode):
         raise HTTPException(status_code=400, detail="Main file is not a file")
 
-    requirements_file = structure.structure_config.build.requirements_file
+    requirements_file = (
+        structure.structure_config.build.requirements_file or "requirements.txt"
+    )
 
-    if not os.path.exists(f"{structure.directory}/{requirements_file}"):
+    if _stat(f"{structure.directory}/{requirements_file}") is None:
         raise HTTPException(
             status_code=400, detail="requirements.txt file does not exist"
         )
 
 
-def _check_run_process(run_process: RunProcess) -> RunProcess:
+async def _supervise_run(run_process: RunProcess) -> RunProcess:
     process = run_process.process
 
-    if process is not None:
-        return_code = process.poll()
-        if return_code is not None:
-            stdout, stderr = run_process.process.communicate()
-            if return_code == 0:
-                run_process.run.status = StructureRun.Status.SUCCEEDED
-            else:
-                run_process.run.status = StructureRun.Status.FAILED
+    try:
+        await _wait_for_run(run_process)
+    except Exception:
+        logger.exception(f"Failed to supervise run: {run_process.run.structure_run_id}")
+        run_process.run.status = StructureRun.Status.FAILED
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+    finally:
+        run_process.artifacts.close()
+
+    # Runs that outlive their Structure are removed once they finish.
+    structure_run_id = run_process.run.structure_run_id
+    if run_process.run.structure.structure_id not in state.structures:
+        await asyncio.to_thread(_remove_run, structure_run_id)
 
-            timestamp = datetime.datetime.now().isoformat()
-            if stdout is not None and stdout != b"":
-                run_process.run.logs.append(
-                    Log(time=timestamp, message=stdout, stream=Log.Stream.STDOUT)
-                )
+    try:
+        await asyncio.to_thread(_remove_unused_venvs, run_process.run.structure)
+    except Exception:
+        logger.exception(
+            f"Failed to remove unused venvs after run: {run_process.run.structure_run_id}"
+        )
 
-            if stderr is not None and stderr != b"":
-                run_process.run.logs.append(
-                    Log(time=timestamp, message=stderr, stream=Log.Stream.STDERR)
-                )
+    return run_process
+
+
+async def _wait_for_run(run_process: RunProcess) -> RunProcess:
+    process = run_process.process
+    queue_task = asyncio.create_task(_set_structure_run_to_running(run_process))
+    readers = asyncio.gather(
+        _read_run_stream(run_process, process.stdout, Log.Stream.STDOUT),
+        _read_run_stream(run_process, process.stderr, Log.Stream.STDERR),
+    )
+    waiter = asyncio.ensure_future(process.wait())
+    run_timeout = float(os.getenv("GT_SKATEPARK_RUN_TIMEOUT", DEFAULT_RUN_TIMEOUT))
+    timed_out = False
+
+    try:
+        # Return early if a reader fails, otherwise the child could block forever on
+        # a full pipe.
+        await asyncio.wait(
+            {readers, waiter},
+            timeout=run_timeout or None,
+            return_when=asyncio.FIRST_EXCEPTION,
+        )
+        if not waiter.done():
+            timed_out = True
+            process.kill()
+            await waiter
+        await readers
+    finally:
+        queue_task.cancel()
+        readers.cancel()
+        waiter.cancel()
+
+    if process.returncode == 0 and not timed_out:
+        run_process.run.status = StructureRun.Status.SUCCEEDED
+    else:
+        run_process.run.status = StructureRun.Status.FAILED
+
+    if timed_out:
+        _append_run_log(
+            run_process,
+            Log(
+                time=datetime.datetime.now().isoformat(),
+                message=f"Structure Run timed out after {run_timeout} seconds",
+                stream=Log.Stream.STDERR,
+            ),
+        )
+
+    if (
+        run_process.run.status == StructureRun.Status.SUCCEEDED
+        and run_process.cache_key
+    ):
+        # The cache keeps its own copy so that the run's directory can be removed
+        # independently, and deletes it again on eviction.
+        entry = await asyncio.to_thread(_copy_to_run_cache, run_process.artifacts)
+        evicted = state.run_cache.put(run_process.cache_key, entry)
+        await asyncio.to_thread(_delete_cache_entries, evicted)
 
     return run_process
 
 
-def _set_structure_run_to_running(structure_run: StructureRun) -> StructureRun:
+async def _read_run_stream(
+    run_process: RunProcess, stream: asyncio.StreamReader, log_stream: Log.Stream
+) -> None:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    eof = False
+    while not eof:
+        try:
+            chunk = await stream.readuntil(b"\n")
+        except asyncio.IncompleteReadError as e:
+            # Flush the decoder at EOF so that a trailing partial character is
+            # replaced rather than dropped.
+            chunk = e.partial
+            eof = True
+        except asyncio.LimitOverrunError as e:
+            # Split lines longer than the stream's limit into several log entries.
+            chunk = await stream.readexactly(e.consumed)
+
+        message = decoder.decode(chunk, final=eof)
+        if message:
+            _append_run_log(
+                run_process,
+                Log(
+                    time=datetime.datetime.now().isoformat(),
+                    message=message,
+                    stream=log_stream,
+                ),
+            )
+
+
+def _append_run_log(run_process: RunProcess, log: Log) -> None:
+    run_process.artifacts.append_log(log)
+    run_process.run.log_count = run_process.artifacts.log_count
+    run_process.run.logs_size = run_process.artifacts.logs_size
+
+
+def _dump_run_json(run_process: RunProcess) -> str:
+    run = run_process.run
+    if run.output is not None or not run_process.artifacts.output_size:
+        return run.model_dump_json()
+
+    # Splice the stored output in as-is rather than parsing and re-serializing it.
+    run_json = run.model_dump_json(exclude={"output"})
+    output_json = run_process.artifacts.read_output_json()
+
+    return f'{run_json[:-1]},"output":{output_json}}}'
+
+
+def _copy_to_run_cache(artifacts: RunArtifactStore) -> RunCacheEntry:
+    copy = RunArtifactStore(directory=_get_cache_entry_dir())
+    copy.copy_from(artifacts)
+
+    return RunCacheEntry.from_artifacts(copy)
+
+
+def _delete_cache_entries(entries: list[RunCacheEntry]) -> None:
+    for entry in entries:
+        entry.delete()
+
+
+def _run_cache_enabled() -> bool:
+    return os.getenv("GT_SKATEPARK_RUN_CACHE", DEFAULT_RUN_CACHE).lower() == "true"
+
+
+async def _set_structure_run_to_running(run_process: RunProcess) -> RunProcess:
     run_delay = int(os.getenv("GT_SKATEPARK_QUEUE_DELAY", DEFAULT_QUEUE_DELAY))
 
-    time.sleep(run_delay)
+    await asyncio.sleep(run_delay)
 
-    structure_run.status = StructureRun.Status.RUNNING
+    if run_process.run.status == StructureRun.Status.QUEUED:
+        run_process.run.status = StructureRun.Status.RUNNING
 
-    return structure_run
+    return run_process
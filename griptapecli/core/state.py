@@ -1,22 +1,39 @@
 from __future__ import annotations
 
+from asyncio import Task
+from asyncio.subprocess import Process
+from threading import Lock
+from typing import Optional
+
 from attrs import Factory, define, field
 from fastapi import HTTPException
-from subprocess import Popen
 
+from .artifacts import RunArtifactStore
+from .cache import RunCache
 from .models import StructureRun, Structure
 
 
 @define
 class RunProcess:
     run: StructureRun = field()
-    process: Popen = field()
+    process: Optional[Process] = field()
+    artifacts: RunArtifactStore = field()
+    task: Optional[Task] = field(default=None)
+    venv: Optional[str] = field(default=None)
+    profile_file: Optional[str] = field(default=None)
+    cache_key: Optional[str] = field(default=None)
 
 
 @define
 class State:
     structures: dict[str, Structure] = field(default=Factory(dict))
     runs: dict[str, RunProcess] = field(default=Factory(dict))
+    dependencies: dict[str, str] = field(default=Factory(dict))
+    build_fingerprints: dict[str, str] = field(default=Factory(dict))
+    venvs: dict[str, str] = field(default=Factory(dict))
+    building_venvs: set[str] = field(default=Factory(set))
+    venvs_lock: Lock = field(default=Factory(Lock))
+    run_cache: RunCache = field(default=Factory(RunCache))
 
     def register_structure(self, structure: Structure) -> None:
         self.structures[structure.structure_id] = structure
@@ -29,8 +46,14 @@ class State:
 
     def remove_structure(self, structure_id: str) -> str:
         if structure_id in self.structures:
-            del self.structures[structure_id]
+            self.discard_structure(structure_id)
 
             return structure_id
         else:
             raise HTTPException(status_code=400, detail="Structure not registered")
+
+    def discard_structure(self, structure_id: str) -> None:
+        self.structures.pop(structure_id, None)
+        self.dependencies.pop(structure_id, None)
+        self.build_fingerprints.pop(structure_id, None)
+        self.venvs.pop(structure_id, None)
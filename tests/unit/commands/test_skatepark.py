@@ -0,0 +1,14 @@
+from griptapecli.commands.skatepark import _discover_structures
+
+
+class TestSkatepark:
+    def test_discover_structures(self, tmp_path):
+        for directory in ["a", "a/b", ".hidden", "node_modules/c", "__pycache__", "d"]:
+            (tmp_path / directory).mkdir(parents=True)
+            (tmp_path / directory / "structure_config.yaml").write_text("")
+        (tmp_path / "d" / "structure_config.yaml").unlink()
+
+        assert _discover_structures(str(tmp_path), "structure_config.yaml") == [
+            str(tmp_path / "a"),
+            str(tmp_path / "a" / "b"),
+        ]
@@ -0,0 +1,67 @@
+from griptapecli.core.artifacts import RunArtifactStore
+from griptapecli.core.models import Event, Log
+
+
+class TestRunArtifactStore:
+    def _create_store(self, tmp_path, count: int) -> RunArtifactStore:
+        store = RunArtifactStore(directory=str(tmp_path))
+        for i in range(count):
+            store.append_log(
+                Log(time=str(i), message=f"line {i}\n", stream=Log.Stream.STDOUT)
+            )
+
+        return store
+
+    def test_init(self, tmp_path):
+        store = RunArtifactStore(directory=str(tmp_path))
+
+        assert store.read_logs() == []
+        assert store.tail_logs(5) == []
+        assert store.read_events() == []
+        assert store.read_output() is None
+
+    def test_read_logs(self, tmp_path):
+        store = self._create_store(tmp_path, 10)
+
+        assert store.log_count == 10
+        assert [log.time for log in store.read_logs()] == [str(i) for i in range(10)]
+        assert [log.time for log in store.read_logs(offset=3, limit=2)] == ["3", "4"]
+        assert [log.time for log in store.read_logs(offset=8, limit=5)] == ["8", "9"]
+        assert store.read_logs(offset=10) == []
+
+    def test_tail_logs(self, tmp_path):
+        store = self._create_store(tmp_path, 10)
+
+        assert [log.time for log in store.tail_logs(3)] == ["7", "8", "9"]
+        assert len(store.tail_logs(20)) == 10
+        assert store.tail_logs(0) == []
+
+    def test_events(self, tmp_path):
+        store = RunArtifactStore(directory=str(tmp_path))
+        events = [Event(value={"foo": "bar"}), Event(value={"foo": "baz"})]
+        for event in events:
+            store.append_event(event)
+        store.close()
+
+        assert store.event_count == 2
+        assert store.read_events() == events
+
+    def test_output(self, tmp_path):
+        store = RunArtifactStore(directory=str(tmp_path))
+        store.write_output({"value": "foo"})
+
+        assert store.read_output() == {"value": "foo"}
+        assert store.output_size > 0
+
+    def test_copy_from(self, tmp_path):
+        (tmp_path / "a").mkdir()
+        (tmp_path / "b").mkdir()
+        store = self._create_store(tmp_path / "a", 2)
+        store.append_event(Event(value={"foo": "bar"}))
+        store.write_output({"value": "foo"})
+        copy = RunArtifactStore(directory=str(tmp_path / "b"))
+        copy.copy_from(store)
+
+        assert copy.read_logs() == store.read_logs()
+        assert copy.read_events() == store.read_events()
+        assert copy.read_output() == {"value": "foo"}
@@ -0,0 +1,94 @@
+import os
+
+from griptapecli.core.artifacts import RunArtifactStore
+from griptapecli.core.cache import (
+    RunCache,
+    RunCacheEntry,
+    build_run_cache_key,
+    fingerprint_files,
+    fingerprint_structure,
+)
+from griptapecli.core.models import Event, Structure
+
+
+class TestRunCache:
+    def test_init(self):
+        assert RunCache()
+
+    def test_put_get(self, tmp_path):
+        cache = RunCache()
+        artifacts = RunArtifactStore(directory=str(tmp_path))
+        artifacts.append_event(Event(value={}))
+        entry = RunCacheEntry.from_artifacts(artifacts)
+        cache.put("key", entry)
+
+        assert cache.get("key") is entry
+        assert cache.get("missing") is None
+        assert cache.size == entry.size
+
+    def test_evicts_least_recently_used(self, tmp_path):
+        artifacts = RunArtifactStore(directory=str(tmp_path))
+        cache = RunCache(max_entries=2)
+        cache.put("a", RunCacheEntry.from_artifacts(artifacts))
+        b = RunCacheEntry.from_artifacts(artifacts)
+        cache.put("b", b)
+        cache.get("a")
+        evicted = cache.put("c", RunCacheEntry.from_artifacts(artifacts))
+
+        assert list(cache.entries.keys()) == ["a", "c"]
+        assert evicted == [b]
+
+    def test_evicts_by_size(self, tmp_path):
+        artifacts = RunArtifactStore(directory=str(tmp_path))
+        artifacts.append_event(Event(value={"foo": "bar"}))
+        entry = RunCacheEntry.from_artifacts(artifacts)
+        cache = RunCache(max_size=entry.size)
+        cache.put("a", entry)
+        cache.put("b", RunCacheEntry.from_artifacts(artifacts))
+
+        assert list(cache.entries.keys()) == ["b"]
+        assert cache.size == entry.size
+
+    def test_build_run_cache_key(self):
+        structure = Structure(
+            directory=os.path.join(os.getcwd(), "tests", "unit", "core", "utils"),
+            structure_config_file="structure_config.yaml",
+        )
+
+        key = build_run_cache_key(structure, "", ["foo"], {})
+
+        assert key == build_run_cache_key(structure, "", ["foo"], {})
+        assert key != build_run_cache_key(structure, "", ["bar"], {})
+        assert key != build_run_cache_key(structure, "", ["foo"], {"FOO": "bar"})
+
+    def test_fingerprint_structure_skips_special_files(self, tmp_path):
+        (tmp_path / "structure_config.yaml").write_text(
+            "version: 1.0\nruntime: python3\nruntime_version: 3.11\n"
+            "run:\n  main_file: main.py\n"
+        )
+        structure = Structure(
+            directory=str(tmp_path), structure_config_file="structure_config.yaml"
+        )
+        fingerprint = fingerprint_structure(structure)
+        (tmp_path / "broken").symlink_to(tmp_path / "missing")
+        os.mkfifo(tmp_path / "fifo")
+
+        assert fingerprint_structure(structure) == fingerprint
+
+    def test_fingerprint_files_separates_paths(self, tmp_path):
+        (tmp_path / "ab").write_text("c")
+        (tmp_path / "a").write_text("bc")
+
+        assert fingerprint_files([str(tmp_path / "ab")]) != fingerprint_files(
+            [str(tmp_path / "a")]
+        )
+
+    def test_delete(self, tmp_path):
+        artifacts = RunArtifactStore(directory=str(tmp_path / "entry"))
+        os.makedirs(artifacts.directory)
+        artifacts.append_event(Event(value={}))
+        artifacts.close()
+
+        RunCacheEntry.from_artifacts(artifacts).delete()
+
+        assert not os.path.exists(artifacts.directory)
@@ -17,3 +17,16 @@ class TestModels:
                 "tests", "unit", "core", "utils", "structure_config.yaml"
             ),
         )
+
+    def test_structure_get_dependency_files(self):
+        structure = Structure(
+            directory=os.getcwd(),
+            structure_config_file=os.path.join(
+                "tests", "unit", "core", "utils", "structure_config.yaml"
+            ),
+        )
+
+        assert structure.get_dependency_files() == [
+            os.path.join(os.getcwd(), "src/requirements.txt"),
+            os.path.join(os.getcwd(), "requirements.txt"),
+        ]
@@ -0,0 +1,42 @@
+from griptapecli.core.recording import TrafficRecorder, load_capture, percentile
+
+
+class TestRecording:
+    def test_record(self, tmp_path):
+        file = str(tmp_path / "capture.ndjson")
+        recorder = TrafficRecorder(file=file)
+        recorder.record(
+            method="POST",
+            route="/api/structure-runs/{structure_run_id}/events",
+            path="/api/structure-runs/foo/events",
+            query="",
+            body=b'{"type": "bar"}',
+            status_code=201,
+            started_at=recorder.started_at + 2,
+            duration=0.1,
+        )
+        recorder.record(
+            method="GET",
+            route="/api/structure-runs/{structure_run_id}",
+            path="/api/structure-runs/foo",
+            query="",
+            body=b"",
+            status_code=200,
+            started_at=recorder.started_at + 1,
+            duration=0.1,
+        )
+
+        entries = load_capture(file)
+
+        assert [entry["method"] for entry in entries] == ["GET", "POST"]
+        assert entries[0]["body"] is None
+        assert entries[1]["body"] == {"type": "bar"}
+        assert entries[1]["t"] == 2
+
+    def test_percentile(self):
+        values = [float(i) for i in range(1, 101)]
+
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile(values, 100) == 100
+        assert percentile([], 50) == 0
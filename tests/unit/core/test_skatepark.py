@@ -0,0 +1,250 @@
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from griptapecli.core.artifacts import RunArtifactStore
+from griptapecli.core.models import ListStructureRunLogsResponseModel, Structure
+from griptapecli.core.skatepark import (
+    _build_structure_in_background,
+    build_executor,
+    _get_venvs_dir,
+    _get_venvs_in_use,
+    _remove_unused_venvs,
+    app,
+    state,
+)
+
+
+class TestSkatepark:
+    @pytest.fixture
+    def structure(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("GT_SKATEPARK_QUEUE_DELAY", "0")
+        monkeypatch.setenv("GT_SKATEPARK_DATA_DIR", str(tmp_path / "data"))
+
+        directory = tmp_path / "structure"
+        directory.mkdir()
+        (directory / "structure_config.yaml").write_text(
+            "version: 1.0\n"
+            "runtime: python3\n"
+            "runtime_version: 3.11\n"
+            "run:\n"
+            "  main_file: main.py\n"
+        )
+        (directory / "requirements.txt").write_text("")
+        (directory / "main.py").write_text(
+            "import sys\n" "print('foo')\n" "sys.exit(int(sys.argv[1]))\n"
+        )
+        structure = Structure(
+            directory=str(directory), structure_config_file="structure_config.yaml"
+        )
+
+        # Stand in for a built venv by pointing at the current interpreter.
+        venv = tmp_path / "venv"
+        (venv / "bin").mkdir(parents=True)
+        (venv / "bin" / "python3").symlink_to(sys.executable)
+
+        state.register_structure(structure)
+        state.venvs[structure.structure_id] = str(venv)
+        yield structure
+        state.remove_structure(structure.structure_id)
+
+    def _run(self, client: TestClient, structure: Structure, **run_input) -> dict:
+        response = client.post(
+            f"/api/structures/{structure.structure_id}/runs", json=run_input
+        )
+        structure_run_id = response.json()["structure_run_id"]
+        for _ in range(100):
+            run = client.get(f"/api/structure-runs/{structure_run_id}").json()
+            if run["status"] in ["SUCCEEDED", "FAILED"]:
+                return run
+            time.sleep(0.1)
+
+        raise TimeoutError(f"Run did not finish: {structure_run_id}")
+
+    @pytest.mark.parametrize("profile", [False, True])
+    def test_run_status(self, structure, profile):
+        with TestClient(app) as client:
+            succeeded = self._run(client, structure, args=["0"], profile=profile)
+            failed = self._run(client, structure, args=["3"], profile=profile)
+
+            assert succeeded["status"] == "SUCCEEDED"
+            assert failed["status"] == "FAILED"
+
+    def test_run_profile(self, structure):
+        with TestClient(app) as client:
+            run = self._run(client, structure, args=["3"], profile=True)
+            response = client.get(
+                f"/api/structure-runs/{run['structure_run_id']}/profile"
+            )
+
+            assert response.status_code == 200
+            assert len(response.content) > 0
+
+    def test_run_supervisor_error(self, structure, mocker):
+        mocker.patch.object(
+            RunArtifactStore, "append_log", side_effect=OSError("disk full")
+        )
+
+        with TestClient(app) as client:
+            assert self._run(client, structure, args=["0"])["status"] == "FAILED"
+
+    def test_run_venv_in_use_before_spawn(self, structure, mocker):
+        venv = state.venvs[structure.structure_id]
+        venvs_in_use = []
+
+        async def create_subprocess_exec(*args, **kwargs):
+            # Simulate a build switching the structure to a new venv mid-spawn.
+            state.venvs[structure.structure_id] = "new-venv"
+            venvs_in_use.append(_get_venvs_in_use(structure.structure_id))
+            raise OSError("spawn failed")
+
+        mocker.patch(
+            "asyncio.create_subprocess_exec", side_effect=create_subprocess_exec
+        )
+
+        with TestClient(app) as client, pytest.raises(OSError):
+            client.post(f"/api/structures/{structure.structure_id}/runs", json={})
+
+        assert venvs_in_use == [{venv, "new-venv"}]
+        assert not any(run.venv == venv for run in state.runs.values())
+
+    def test_run_events_and_output(self, structure):
+        with TestClient(app) as client:
+            run = self._run(client, structure, args=["0"])
+            events_url = f"/api/structure-runs/{run['structure_run_id']}/events"
+            client.post(
+                events_url,
+                json=[
+                    {"type": "StartStructureRunEvent", "timestamp": 2},
+                    {
+                        "type": "FinishStructureRunEvent",
+                        "timestamp": 1,
+                        "output_task_output": {"value": "foo"},
+                    },
+                ],
+            )
+
+            run = client.get(f"/api/structure-runs/{run['structure_run_id']}").json()
+            events = client.get(events_url).json()["events"]
+
+            assert run["output"] == {"value": "foo"}
+            assert run["event_count"] == 2
+            assert [event["value"]["timestamp"] for event in events] == [1, 2]
+
+    def test_build_structure_in_background_after_delete(self):
+        _build_structure_in_background("deleted")
+
+        assert "deleted" not in state.structures
+
+    def test_remove_unused_venvs(self, structure):
+        venvs_dir = _get_venvs_dir(structure)
+        building_venv = os.path.join(venvs_dir, "building")
+        unused_venv = os.path.join(venvs_dir, "unused")
+        os.makedirs(building_venv)
+        os.makedirs(unused_venv)
+        state.building_venvs.add(building_venv)
+
+        try:
+            _remove_unused_venvs(structure)
+        finally:
+            state.building_venvs.discard(building_venv)
+
+        assert os.path.isdir(building_venv)
+        assert not os.path.exists(unused_venv)
+
+    def test_run_logs_are_lines(self, structure):
+        # End on a truncated UTF-8 sequence, which is replaced rather than dropped.
+        (Path(structure.directory) / "main.py").write_text(
+            "import sys\n" "sys.stdout.buffer.write(b'a\\nb\\nc\\xe2\\x82')\n"
+        )
+
+        with TestClient(app) as client:
+            run = self._run(client, structure)
+            logs = client.get(
+                f"/api/structure-runs/{run['structure_run_id']}/logs"
+            ).json()["logs"]
+
+            assert [log["message"] for log in logs] == ["a\n", "b\n", "c\ufffd"]
+
+    def test_delete_structure_removes_runs(self, structure):
+        with TestClient(app) as client:
+            run = self._run(client, structure, args=["0"])
+            run_dir = state.runs[run["structure_run_id"]].artifacts.directory
+            client.delete(f"/api/structures/{structure.structure_id}")
+
+            assert run["structure_run_id"] not in state.runs
+            assert not os.path.exists(run_dir)
+
+            state.register_structure(structure)
+
+    def test_run_logs_encodings(self, structure):
+        (Path(structure.directory) / "main.py").write_text(
+            "for i in range(100):\n" "    print(i)\n"
+        )
+
+        with TestClient(app) as client:
+            run = self._run(client, structure)
+            url = f"/api/structure-runs/{run['structure_run_id']}/logs"
+            artifacts = state.runs[run["structure_run_id"]].artifacts
+            expected = ListStructureRunLogsResponseModel(
+                logs=artifacts.read_logs()
+            ).model_dump(mode="json")
+
+            json_response = client.get(url)
+            ndjson_response = client.get(
+                url, params={"tail": 10}, headers={"Accept": "application/x-ndjson"}
+            )
+
+            assert json_response.headers["content-encoding"] == "gzip"
+            assert json_response.json() == expected
+            assert ndjson_response.headers["content-type"] == "application/x-ndjson"
+            assert [
+                json.loads(line) for line in ndjson_response.text.splitlines()
+            ] == expected["logs"][-10:]
+
+    def test_create_structures_batch(self, structure, tmp_path, mocker):
+        submit = mocker.patch.object(build_executor, "submit")
+
+        with TestClient(app) as client:
+            response = client.post(
+                "/api/structures:batch",
+                json={
+                    "structures": [
+                        {
+                            "directory": structure.directory,
+                            "structure_config_file": "structure_config.yaml",
+                        },
+                        {
+                            "directory": str(tmp_path / "missing"),
+                            "structure_config_file": "structure_config.yaml",
+                        },
+                    ]
+                },
+            )
+
+        assert response.status_code == 201
+        assert [s["structure_id"] for s in response.json()["structures"]] == [
+            structure.structure_id
+        ]
+        [error] = response.json()["errors"]
+        assert error["directory"] == str(tmp_path / "missing")
+        assert "Invalid structure config" in error["detail"]
+        submit.assert_called_once_with(
+            _build_structure_in_background, structure.structure_id
+        )
+
+    def test_put_run_conflict(self, structure):
+        with TestClient(app) as client:
+            run = self._run(client, structure, args=["0"])
+            response = client.put(
+                f"/api/structure-runs/{run['structure_run_id']}",
+                json={"status": "RUNNING"},
+            )
+
+            assert response.status_code == 409
+            assert state.runs[run["structure_run_id"]].run.structure is not None
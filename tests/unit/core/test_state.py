@@ -1,6 +1,19 @@
+import pytest
+from fastapi import HTTPException
+
 from griptapecli.core.state import State
 
 
 class TestState:
     def test_init(self):
         assert State()
+
+    def test_discard_structure(self):
+        state = State()
+        state.venvs["foo"] = "venv"
+
+        state.discard_structure("foo")
+
+        assert state.venvs == {}
+        with pytest.raises(HTTPException):
+            state.remove_structure("foo")